@@ -2,6 +2,7 @@ from flask import Flask, jsonify, request
 from kite_integration import KiteIntegration
 from signal_generator import SignalGenerator
 from option_analyzer import OptionAnalyzer
+from market_scanner import MarketScanner
 import os
 from dotenv import load_dotenv
 import logging
@@ -19,6 +20,8 @@ logger = logging.getLogger(__name__)
 kite_integration = KiteIntegration()
 signal_generator = SignalGenerator(kite_integration)
 option_analyzer = OptionAnalyzer(kite_integration)
+# Reads the bar matrix published by `python market_scanner.py`
+market_scanner = MarketScanner(kite_integration)
 
 @app.route('/')
 def home():
@@ -55,6 +58,34 @@ def get_option_chain(symbol):
         logger.error(f"Error fetching option chain: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/strategies/<symbol>')
+def get_strategies(symbol):
+    try:
+        # Rank multi-leg option strategies around the given underlying price
+        current_price = request.args.get('price', type=float)
+        if current_price is None or not current_price > 0:
+            return jsonify({"error": "Query parameter 'price' must be a positive number"}), 400
+
+        sort_by = request.args.get('sort_by', 'score')
+        limit = request.args.get('limit', 10, type=int)
+        if limit <= 0:
+            return jsonify({"error": "Query parameter 'limit' must be a positive integer"}), 400
+
+        # Optional comma-separated scenario axes, e.g. ?iv_shifts=-0.05,0,0.05&days_forward=0,5
+        scenario_args = {}
+        for key, cast in (('price_moves', float), ('iv_shifts', float), ('days_forward', int)):
+            if request.args.get(key):
+                scenario_args[key] = [cast(value) for value in request.args[key].split(',')]
+
+        strategies = option_analyzer.rank_strategies(symbol, current_price, sort_by=sort_by,
+                                                     limit=limit, **scenario_args)
+        return jsonify(strategies)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error ranking strategies: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/signals/<symbol>')
 def get_signals(symbol):
     try:
@@ -65,5 +96,21 @@ def get_signals(symbol):
         logger.error(f"Error generating signals: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/scan')
+def scan_market():
+    try:
+        # Screen the whole universe from the shared bar matrix
+        screen = request.args.get('screen')
+        limit = request.args.get('limit', 50, type=int)
+        result = market_scanner.scan(screen, limit)
+        if 'error' in result:
+            return jsonify(result), 503
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error scanning market: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 if __name__ == '__main__':
     app.run(debug=True)
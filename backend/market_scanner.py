@@ -0,0 +1,503 @@
+import numpy as np
+from kiteconnect import exceptions as kite_exceptions
+from datetime import datetime, timedelta
+from multiprocessing import shared_memory, resource_tracker
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ['open', 'high', 'low', 'close', 'volume']
+SYMBOL_DTYPE = np.dtype('U32')
+HEADER_DTYPE = np.dtype(np.int64)
+# Data block header: n_fields, n_symbols, n_bars, failed symbols, stale symbols
+HEADER_FIELDS = 5
+
+# Errors no retry can fix: a per-symbol bad request, or an expired/invalid session
+# that would fail every remaining symbol too
+PERMANENT_ERRORS = (kite_exceptions.InputException,)
+SESSION_ERRORS = (kite_exceptions.TokenException, kite_exceptions.PermissionException)
+
+# NSE series traded outside the EQ series, appended to the symbol as '-<series>':
+# trade-for-trade (BE/BZ/BL), SME (SM/ST), gold bonds, G-secs, T-bills, InvITs/REITs
+NON_EQUITY_SERIES = {'BE', 'BZ', 'BL', 'SM', 'ST', 'GB', 'GS', 'SG', 'TB', 'IV', 'RR'}
+# Debt series such as N1-N9, NA-NZ, Y*, Z*
+DEBT_SERIES = re.compile(r'[NYZ][0-9A-Z]')
+
+
+def is_equity_series(tradingsymbol):
+    """False for '-<series>' symbols outside the EQ series; BAJAJ-AUTO or MCDOWELL-N stay in"""
+    if '-' not in tradingsymbol:
+        return True
+    series = tradingsymbol.rsplit('-', 1)[-1]
+    return not (series in NON_EQUITY_SERIES or DEBT_SERIES.fullmatch(series))
+
+
+def _untrack(shm):
+    """Stop the resource tracker from unlinking a block when this process exits"""
+    # Only POSIX tracks shared memory; Windows frees a block once its last handle closes
+    if os.name == 'posix':
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+def _create_block(name, size):
+    return _untrack(shared_memory.SharedMemory(name=name, create=True, size=size))
+
+
+def _attach_block(name):
+    return _untrack(shared_memory.SharedMemory(name=name))
+
+
+def _unlink_block(name):
+    if os.name != 'posix':
+        return
+    try:
+        # Left tracked: unlink() unregisters it from the resource tracker itself
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+def ewm(values, alpha, min_periods):
+    """Exponentially weighted mean along bars, seeded at each symbol's first bar"""
+    result = np.full(values.shape, np.nan)
+    average = np.full(values.shape[0], np.nan)
+    count = np.zeros(values.shape[0])
+
+    for t in range(values.shape[1]):
+        current = values[:, t]
+        valid = ~np.isnan(current)
+        average = np.where(np.isnan(average), current,
+                           np.where(valid, average + alpha * (current - average), average))
+        count += valid
+        result[:, t] = np.where(count >= min_periods, average, np.nan)
+
+    return result
+
+
+class MarketScanner:
+    """Whole-universe scanner over a (fields x symbols x bars) matrix in shared memory.
+
+    One process calls publish() (see __main__ below) to fetch daily bars for the
+    NSE universe and write them to a new shared memory block. Flask workers call
+    scan(), which attaches to the latest block read-only, so every worker shares
+    a single copy of the bars. A small index block holds the current generation;
+    readers reattach whenever it changes.
+
+    The writer keeps its handles to the index and the latest generation open:
+    on Windows a named block disappears once its last handle closes, so the
+    writer process must stay running there.
+    """
+
+    SCREENS = {
+        'above_both_smas_rsi_40_60': lambda ind: ((ind['close'] > ind['sma_20']) &
+                                                   (ind['close'] > ind['sma_50']) &
+                                                   (ind['rsi'] > 40) & (ind['rsi'] < 60)),
+        'bullish': lambda ind: ind['direction'] == 1,
+        'bearish': lambda ind: ind['direction'] == -1,
+        'overbought': lambda ind: ind['rsi'] > 70,
+        'oversold': lambda ind: ind['rsi'] < 30,
+        'macd_bullish': lambda ind: ind['macd'] > ind['macd_signal'],
+        'above_upper_bb': lambda ind: ind['close'] > ind['bb_upper'],
+        'below_lower_bb': lambda ind: ind['close'] < ind['bb_lower'],
+    }
+
+    def __init__(self, kite_integration, name='market_scanner', bars=100, lookback_days=150,
+                 requests_per_second=3, retries=3, backoff=1.0,
+                 max_consecutive_failures=20, max_failed_fraction=0.5, stale_sessions=3):
+        self.kite = kite_integration
+        self.name = name
+        self.bars = bars
+        self.lookback_days = lookback_days
+
+        # Kite's historical endpoint allows 3 requests per second
+        self.requests_per_second = requests_per_second
+        self.retries = retries
+        self.backoff = backoff
+        self._last_request = 0.0
+
+        # Refresh guards: abort a run that is clearly failing, never publish a bad one
+        self.max_consecutive_failures = max_consecutive_failures
+        self.max_failed_fraction = max_failed_fraction
+        # Sessions a symbol's last bar may lag the latest one before it counts as stale
+        self.stale_sessions = stale_sessions
+
+        # Request threads share one scanner; _lock guards the mapping and the cache
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._indicators = None
+        self._index = None
+        self._published = {}
+
+    def get_universe(self):
+        """Resolve NSE equities and indices (covers all F&O underlyings) to instrument tokens"""
+        try:
+            instruments = self.kite.get_instruments(exchange="NSE")
+            return {instrument['tradingsymbol']: instrument['instrument_token']
+                    for instrument in instruments
+                    if instrument['segment'] in ('NSE', 'INDICES') and
+                    instrument['instrument_type'] == 'EQ' and
+                    is_equity_series(instrument['tradingsymbol'])}
+        except Exception as e:
+            logger.error(f"Error fetching scanner universe: {str(e)}")
+            raise
+
+    def _fetch_history(self, instrument_token, start_date, end_date):
+        """Historical bars within Kite's rate limit, retrying failures with backoff"""
+        for attempt in range(self.retries + 1):
+            wait = self._last_request + 1.0 / self.requests_per_second - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_request = time.monotonic()
+
+            try:
+                return self.kite.get_historical_data(
+                    instrument_token=instrument_token,
+                    from_date=start_date,
+                    to_date=end_date,
+                    interval="day"
+                )
+            except PERMANENT_ERRORS + SESSION_ERRORS:
+                raise
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def fetch_bars(self, universe):
+        """Fetch daily bars for every symbol, right-aligned and NaN-padded to self.bars.
+
+        Symbols that fail after retries or return no bars are counted as 'failed'.
+        Symbols whose last bar lags the universe's latest session by more than
+        self.stale_sessions sessions (suspended or delisted) are dropped and
+        counted as 'stale'; a small lag is allowed because during market hours
+        only symbols that have already traded have today's partial candle.
+        """
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=self.lookback_days)
+
+        fetched = []
+        failed = 0
+        consecutive = 0
+        for symbol, instrument_token in universe.items():
+            try:
+                historical_data = self._fetch_history(instrument_token, start_date, end_date)
+            except SESSION_ERRORS as e:
+                raise RuntimeError(f"Kite session rejected while fetching {symbol}: {str(e)}") from e
+            except Exception as e:
+                logger.error(f"Error fetching bars for {symbol}: {str(e)}")
+                historical_data = None
+
+            if not historical_data:
+                failed += 1
+                consecutive += 1
+                if consecutive >= self.max_consecutive_failures:
+                    raise RuntimeError(f"Aborting bar fetch after {consecutive} consecutive failures")
+                continue
+            consecutive = 0
+
+            recent = historical_data[-self.bars:]
+            dates = [bar['date'].date() if isinstance(bar['date'], datetime) else bar['date']
+                     for bar in recent[-(self.stale_sessions + 1):]]
+            fetched.append((symbol, instrument_token, dates, recent))
+
+        # The latest sessions all appear among the last few bars of symbols that traded
+        sessions = sorted({day for _, _, dates, _ in fetched for day in dates})
+        cutoff = sessions[-(self.stale_sessions + 1):][0] if sessions else None
+        current = [entry for entry in fetched if entry[2][-1] >= cutoff]
+        skipped = {'failed': failed, 'stale': len(fetched) - len(current)}
+        if failed or skipped['stale']:
+            logger.warning(f"Scanner skipped {failed} failed and {skipped['stale']} stale symbols")
+
+        matrix = np.full((len(FIELDS), len(current), self.bars), np.nan)
+        for row, (_, _, _, recent) in enumerate(current):
+            for i, field in enumerate(FIELDS):
+                matrix[i, row, self.bars - len(recent):] = [bar[field] for bar in recent]
+
+        symbols = [symbol for symbol, _, _, _ in current]
+        tokens = [instrument_token for _, instrument_token, _, _ in current]
+        return symbols, tokens, matrix, skipped
+
+    def publish(self, symbols, tokens, matrix, skipped=None):
+        """Write a bar matrix to a new shared memory block and point readers at it"""
+        skipped = skipped or {}
+        try:
+            index = self._open_index(create=True)
+            current = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=index.buf)
+            previous = int(current[0])
+            generation = previous + 1
+
+            n_symbols, n_bars = matrix.shape[1], matrix.shape[2]
+            header_size = HEADER_FIELDS * HEADER_DTYPE.itemsize
+            symbols_size = n_symbols * SYMBOL_DTYPE.itemsize
+            tokens_size = n_symbols * HEADER_DTYPE.itemsize
+            block = _create_block(f"{self.name}_{generation}",
+                                  header_size + symbols_size + tokens_size + matrix.nbytes)
+
+            header = np.ndarray((HEADER_FIELDS,), dtype=HEADER_DTYPE, buffer=block.buf)
+            header[:] = [len(FIELDS), n_symbols, n_bars, skipped.get('failed', 0), skipped.get('stale', 0)]
+            offset = header_size
+            np.ndarray((n_symbols,), dtype=SYMBOL_DTYPE, buffer=block.buf, offset=offset)[:] = symbols
+            offset += symbols_size
+            np.ndarray((n_symbols,), dtype=HEADER_DTYPE, buffer=block.buf, offset=offset)[:] = tokens
+            offset += tokens_size
+            np.ndarray(matrix.shape, dtype=np.float64, buffer=block.buf, offset=offset)[:] = matrix
+            del header
+            self._published[generation] = block
+
+            # Flip the generation only once the new block is complete
+            current[0] = generation
+            del current
+
+            if previous:
+                old = self._published.pop(previous, None)
+                if old is not None:
+                    old.close()
+                _unlink_block(f"{self.name}_{previous}")
+
+            logger.info(f"Published scanner generation {generation}: {n_symbols} symbols x {n_bars} bars")
+            return generation
+
+        except Exception as e:
+            logger.error(f"Error publishing scanner matrix: {str(e)}")
+            raise
+
+    def _open_index(self, create=False):
+        """Handle to the generation index block, opened once per process"""
+        if self._index is None:
+            try:
+                self._index = _attach_block(self.name)
+            except FileNotFoundError:
+                if not create:
+                    return None
+                self._index = _create_block(self.name, HEADER_DTYPE.itemsize)
+                self._index.buf[:HEADER_DTYPE.itemsize] = bytes(HEADER_DTYPE.itemsize)
+        return self._index
+
+    def refresh(self):
+        """Fetch the whole universe and publish it, keeping the previous generation on a bad run"""
+        universe = self.get_universe()
+        symbols, tokens, matrix, skipped = self.fetch_bars(universe)
+
+        if not symbols or skipped['failed'] > self.max_failed_fraction * len(universe):
+            logger.error(f"Not publishing scanner refresh: {len(symbols)} of {len(universe)} symbols usable, "
+                         f"{skipped['failed']} failed; keeping the previous generation")
+            return None
+
+        return self.publish(symbols, tokens, matrix, skipped)
+
+    def attach(self):
+        """Map the latest published matrix, reattaching only when the generation changed"""
+        with self._lock:
+            return self._attach() is not None
+
+    def _attach(self):
+        # Caller holds self._lock; every read of the shared matrix happens under it
+        index = self._open_index()
+        if index is None:
+            return self._snapshot
+
+        generation = int(np.ndarray((1,), dtype=HEADER_DTYPE, buffer=index.buf)[0])
+
+        current = self._snapshot
+        if not generation or (current is not None and current['generation'] == generation):
+            return current
+
+        try:
+            block = _attach_block(f"{self.name}_{generation}")
+        except FileNotFoundError:
+            # The writer replaced this generation between our two reads
+            return current
+
+        header = [int(v) for v in np.ndarray((HEADER_FIELDS,), dtype=HEADER_DTYPE, buffer=block.buf)]
+        n_fields, n_symbols, n_bars, failed, stale = header
+        offset = HEADER_FIELDS * HEADER_DTYPE.itemsize
+        symbols = np.ndarray((n_symbols,), dtype=SYMBOL_DTYPE, buffer=block.buf, offset=offset)
+        offset += n_symbols * SYMBOL_DTYPE.itemsize
+        tokens = np.ndarray((n_symbols,), dtype=HEADER_DTYPE, buffer=block.buf, offset=offset)
+        offset += n_symbols * HEADER_DTYPE.itemsize
+        matrix = np.ndarray((n_fields, n_symbols, n_bars), dtype=np.float64, buffer=block.buf, offset=offset)
+        matrix.flags.writeable = False
+
+        self._snapshot = {
+            'generation': generation,
+            'skipped': {'failed': failed, 'stale': stale},
+            'symbols': symbols,
+            'tokens': tokens,
+            'matrix': matrix,
+            'block': block,
+        }
+        self._indicators = None
+        if current is not None:
+            self._release(current)
+        return self._snapshot
+
+    @staticmethod
+    def _release(snapshot):
+        # Drop the array views first so close() can unmap; safe because no view
+        # of the shared block ever leaves self._lock
+        block = snapshot.pop('block')
+        snapshot.clear()
+        block.close()
+
+    def calculate_indicators(self, matrix):
+        """Indicators from calculate_technical_indicators for every symbol at once"""
+        close = matrix[FIELDS.index('close')]
+
+        sma_20 = close[:, -20:].mean(axis=1)
+        sma_50 = close[:, -50:].mean(axis=1)
+
+        ema_12 = ewm(close, 2 / 13, 12)
+        ema_26 = ewm(close, 2 / 27, 26)
+        macd_line = ema_12 - ema_26
+        macd_signal = ewm(macd_line, 2 / 10, 9)
+
+        # Wilder-smoothed RSI(14)
+        delta = np.diff(close, axis=1)
+        avg_gain = ewm(np.where(np.isnan(delta), np.nan, np.maximum(delta, 0)), 1 / 14, 14)[:, -1]
+        avg_loss = ewm(np.where(np.isnan(delta), np.nan, np.maximum(-delta, 0)), 1 / 14, 14)[:, -1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + avg_gain / avg_loss))
+        rsi = np.where(np.isnan(avg_gain), np.nan, rsi)
+
+        bb_std = close[:, -20:].std(axis=1)
+
+        return {
+            'close': close[:, -1].copy(),
+            'sma_20': sma_20,
+            'sma_50': sma_50,
+            'ema_12': ema_12[:, -1],
+            'ema_26': ema_26[:, -1],
+            'rsi': rsi,
+            'macd': macd_line[:, -1],
+            'macd_signal': macd_signal[:, -1],
+            'bb_upper': sma_20 + 2 * bb_std,
+            'bb_middle': sma_20,
+            'bb_lower': sma_20 - 2 * bb_std,
+        }
+
+    def score(self, ind):
+        """Vectorized generate_final_signal scoring (candlestick patterns excluded)"""
+        close = ind['close']
+        direction = np.zeros(close.shape, dtype=int)
+        confidence = np.full(close.shape, 0.5)
+
+        # Trend Analysis (SMA)
+        above_both = (close > ind['sma_20']) & (ind['sma_20'] > ind['sma_50'])
+        below_both = (close < ind['sma_20']) & (ind['sma_20'] < ind['sma_50'])
+        above_short = ~above_both & ~below_both & (close > ind['sma_20'])
+        direction[above_both | above_short] = 1
+        direction[below_both] = -1
+        confidence += np.where(above_both | below_both, 0.2, np.where(above_short, 0.1, 0.0))
+
+        bullish = direction == 1
+        bearish = direction == -1
+
+        # RSI Analysis
+        rsi = ind['rsi']
+        confidence -= 0.1 * (((rsi > 70) & bullish) | ((rsi < 30) & bearish))
+        confidence += 0.05 * ((rsi > 40) & (rsi < 60))
+
+        # MACD Analysis
+        confidence += 0.1 * (((ind['macd'] > ind['macd_signal']) & bullish) |
+                             ((ind['macd'] < ind['macd_signal']) & bearish))
+
+        # Bollinger Bands
+        confidence += 0.05 * (((close > ind['bb_upper']) & bullish) |
+                              ((close < ind['bb_lower']) & bearish))
+
+        return direction, np.clip(confidence, 0.1, 0.95)
+
+    def get_indicators(self):
+        """Indicators and scores for the attached matrix, cached per generation"""
+        with self._lock:
+            snapshot = self._attach()
+            if snapshot is None:
+                return None
+
+            if self._indicators is None:
+                # Copy symbols and tokens so the cached result never pins the shared block
+                indicators = self.calculate_indicators(snapshot['matrix'])
+                indicators['direction'], indicators['confidence'] = self.score(indicators)
+                indicators['symbol'] = snapshot['symbols'].copy()
+                indicators['instrument_token'] = snapshot['tokens'].copy()
+                indicators['generation'] = snapshot['generation']
+                indicators['skipped'] = snapshot['skipped']
+                self._indicators = indicators
+
+            return self._indicators
+
+    def scan(self, screen=None, limit=50):
+        """Return symbols passing a named screen, ranked by signal confidence"""
+        try:
+            if screen is not None and screen not in self.SCREENS:
+                raise ValueError(f"Unknown screen '{screen}'. Available: {', '.join(self.SCREENS)}")
+
+            ind = self.get_indicators()
+            if ind is None:
+                return {"error": "Scanner data not published yet"}
+
+            with np.errstate(invalid='ignore'):
+                mask = self.SCREENS[screen](ind) if screen else np.ones(ind['close'].shape, dtype=bool)
+
+            selected = np.flatnonzero(mask)
+            order = selected[np.argsort(-ind['confidence'][selected], kind='stable')][:limit]
+
+            directions = {1: 'bullish', -1: 'bearish', 0: 'neutral'}
+            results = []
+            for i in order:
+                results.append({
+                    "symbol": str(ind['symbol'][i]),
+                    "instrument_token": int(ind['instrument_token'][i]),
+                    "direction": directions[int(ind['direction'][i])],
+                    "close": round(float(ind['close'][i]), 2),
+                    "confidence": round(float(ind['confidence'][i]), 2),
+                    "indicators": {
+                        key: None if np.isnan(ind[key][i]) else round(float(ind[key][i]), 2)
+                        for key in ('rsi', 'macd', 'sma_20', 'sma_50')
+                    }
+                })
+
+            return {
+                "screen": screen,
+                "generation": ind['generation'],
+                "matches": int(selected.size),
+                "universe": int(ind['close'].size),
+                "skipped": ind['skipped'],
+                "results": results,
+                "timestamp": datetime.now().isoformat()
+            }
+
+        except ValueError:
+            raise
+        except Exception as e:
+            logger.error(f"Error running scan: {str(e)}")
+            return {"error": str(e)}
+
+
+if __name__ == '__main__':
+    # Writer process: python market_scanner.py [refresh_seconds]
+    import sys
+    from kite_integration import KiteIntegration
+
+    logging.basicConfig(level=logging.INFO)
+    scanner = MarketScanner(KiteIntegration())
+    interval = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+
+    while True:
+        try:
+            scanner.refresh()
+        except Exception as e:
+            # Keep running: readers keep the last good generation, and on Windows
+            # it only survives while this process does
+            logger.error(f"Scanner refresh failed: {str(e)}")
+        if not interval and os.name == 'posix':
+            break
+        # On Windows the published blocks live only as long as this process
+        time.sleep(interval or 24 * 60 * 60)
@@ -3,12 +3,14 @@ import numpy as np
 from datetime import datetime
 import logging
 from kite_integration import KiteIntegration
+from strategy_engine import StrategyEngine
 
 logger = logging.getLogger(__name__)
 
 class OptionAnalyzer:
     def __init__(self, kite_integration):
         self.kite = kite_integration
+        self.strategy_engine = StrategyEngine()
 
     def get_option_chain(self, underlying_symbol, expiry_date=None):
         """Get option chain for a given underlying symbol"""
@@ -137,7 +139,8 @@ class OptionAnalyzer:
                 'avg_call_volume': avg_call_volume,
                 'avg_put_volume': avg_put_volume,
                 'optimal_strikes': optimal_strikes,
-                'recommendations': self.generate_recommendations(market_direction, optimal_strikes, current_price)
+                'recommendations': self.generate_recommendations(market_direction, optimal_strikes, current_price),
+                'strategies': self.strategy_engine.rank_strategies(options, current_price, limit=5)
             }
 
             return analysis
@@ -221,6 +224,12 @@ class OptionAnalyzer:
             logger.error(f"Error finding optimal strikes: {str(e)}")
             return {}
 
+    def rank_strategies(self, underlying_symbol, current_price, expiry_date=None,
+                        sort_by='score', limit=10, **scenario_args):
+        """Rank multi-leg strategies built from the live option chain"""
+        options = self.get_option_chain(underlying_symbol, expiry_date)
+        return self.strategy_engine.rank_strategies(options, current_price, sort_by, limit, **scenario_args)
+
     def generate_recommendations(self, market_direction, optimal_strikes, current_price):
         """Generate trading recommendations based on analysis"""
         try:
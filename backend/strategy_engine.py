@@ -0,0 +1,380 @@
+import numpy as np
+from datetime import date, datetime
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Annualised risk-free rate used for Black-Scholes pricing (approx. Indian T-bill yield)
+RISK_FREE_RATE = 0.065
+DEFAULT_IV = 0.20
+
+# Numeric result keys rank_strategies can sort by (higher is better)
+SORT_KEYS = ('score', 'probability_of_profit', 'expected_pnl', 'net_premium', 'max_profit', 'max_loss')
+
+
+def norm_cdf(x):
+    """Standard normal CDF (Abramowitz-Stegun 7.1.26, abs error < 1.5e-7)"""
+    x = np.asarray(x, dtype=float)
+    z = np.abs(x) / np.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 +
+                t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-z * z)
+    return 0.5 * (1.0 + np.sign(x) * erf)
+
+
+def black_scholes_price(spot, strike, time_to_expiry, sigma, is_call, rate=RISK_FREE_RATE):
+    """Black-Scholes price of European options, broadcast over all inputs"""
+    spot = np.asarray(spot, dtype=float)
+    strike = np.asarray(strike, dtype=float)
+    t = np.maximum(np.asarray(time_to_expiry, dtype=float), 0.0)
+    sigma = np.maximum(np.asarray(sigma, dtype=float), 1e-6)
+
+    vol = sigma * np.sqrt(t)
+    expired = vol < 1e-10
+    safe_vol = np.where(expired, 1.0, vol)
+    discount = np.exp(-rate * t)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = (np.log(spot / strike) + (rate + 0.5 * sigma ** 2) * t) / safe_vol
+    d2 = d1 - safe_vol
+
+    call = spot * norm_cdf(d1) - strike * discount * norm_cdf(d2)
+    put = strike * discount * norm_cdf(-d2) - spot * norm_cdf(-d1)
+    price = np.where(is_call, call, put)
+
+    intrinsic = np.where(is_call, np.maximum(spot - strike, 0.0), np.maximum(strike - spot, 0.0))
+    return np.where(expired, intrinsic, price)
+
+
+def implied_volatility(price, spot, strike, time_to_expiry, is_call, rate=RISK_FREE_RATE,
+                       low=1e-4, high=5.0, iterations=60):
+    """Implied volatility by vectorized bisection; NaN where no volatility fits the price"""
+    price = np.asarray(price, dtype=float)
+    lo = np.full(np.broadcast(price, spot, strike, time_to_expiry, is_call).shape, low)
+    hi = np.full(lo.shape, high)
+
+    for _ in range(iterations):
+        mid = 0.5 * (lo + hi)
+        too_high = black_scholes_price(spot, strike, time_to_expiry, mid, is_call, rate) > price
+        hi = np.where(too_high, mid, hi)
+        lo = np.where(too_high, lo, mid)
+
+    iv = 0.5 * (lo + hi)
+    min_price = black_scholes_price(spot, strike, time_to_expiry, low, is_call, rate)
+    max_price = black_scholes_price(spot, strike, time_to_expiry, high, is_call, rate)
+    valid = (price > min_price) & (price < max_price)
+    return np.where(valid, iv, np.nan)
+
+
+def years_to_expiry(expiry, today=None):
+    """Time to expiry in years, floored at one trading day"""
+    if isinstance(expiry, str):
+        expiry = datetime.strptime(expiry[:10], "%Y-%m-%d").date()
+    elif isinstance(expiry, datetime):
+        expiry = expiry.date()
+    today = today or date.today()
+    return max((expiry - today).days, 1) / 365.0
+
+
+class StrategyEngine:
+    """Evaluates multi-leg option strategies as batched NumPy computations.
+
+    A strategy is a dict with a 'name' and a list of 'legs'. Each leg is an
+    option chain entry (as returned by OptionAnalyzer.get_option_chain) plus a
+    signed 'quantity' in lots: positive to buy, negative to sell.
+    """
+
+    def __init__(self, risk_free_rate=RISK_FREE_RATE, price_range=0.3, price_steps=241):
+        self.rate = risk_free_rate
+        self.price_range = price_range
+        self.price_steps = price_steps
+
+    def stack_legs(self, strategies, current_price, today=None):
+        """Pack strategies into (strategies x legs) arrays, zero-quantity padded"""
+        n_strategies = len(strategies)
+        n_legs = max(len(strategy['legs']) for strategy in strategies)
+        shape = (n_strategies, n_legs)
+
+        legs = {
+            'strike': np.full(shape, current_price, dtype=float),
+            'is_call': np.zeros(shape, dtype=bool),
+            'quantity': np.zeros(shape, dtype=float),
+            'premium': np.zeros(shape, dtype=float),
+            'lot_size': np.zeros(shape, dtype=float),
+            'time_to_expiry': np.full(shape, np.inf),
+        }
+
+        for i, strategy in enumerate(strategies):
+            for j, leg in enumerate(strategy['legs']):
+                legs['strike'][i, j] = leg['strike']
+                legs['is_call'][i, j] = leg['instrument_type'] == 'CE'
+                legs['quantity'][i, j] = leg['quantity']
+                legs['premium'][i, j] = leg.get('last_price', 0)
+                legs['lot_size'][i, j] = leg.get('lot_size', 1)
+                legs['time_to_expiry'][i, j] = years_to_expiry(leg['expiry'], today)
+
+        # Padding legs take the strategy's own expiry so they never shorten it
+        padding = legs['quantity'] == 0
+        nearest = legs['time_to_expiry'].min(axis=1, keepdims=True)
+        legs['time_to_expiry'] = np.where(padding, nearest, legs['time_to_expiry'])
+        legs['units'] = legs['quantity'] * legs['lot_size']
+
+        iv = implied_volatility(legs['premium'], current_price, legs['strike'],
+                                legs['time_to_expiry'], legs['is_call'], self.rate)
+        fallback = np.nanmedian(iv) if np.isfinite(iv).any() else DEFAULT_IV
+        legs['iv'] = np.where(np.isfinite(iv), iv, fallback)
+
+        return legs
+
+    def price_grid(self, legs, current_price):
+        """Underlying prices to evaluate: a dense band around spot plus every strike and zero"""
+        band = np.linspace(current_price * (1 - self.price_range),
+                           current_price * (1 + self.price_range), self.price_steps)
+        return np.unique(np.concatenate([[0.0], band, legs['strike'].ravel()]))
+
+    def payoff_at_expiry(self, legs, prices):
+        """P&L at expiry for every strategy and price, shape (strategies, prices)"""
+        spot = prices[None, None, :]
+        strike = legs['strike'][..., None]
+        intrinsic = np.where(legs['is_call'][..., None],
+                             np.maximum(spot - strike, 0.0),
+                             np.maximum(strike - spot, 0.0))
+        leg_pnl = (intrinsic - legs['premium'][..., None]) * legs['units'][..., None]
+        return leg_pnl.sum(axis=1)
+
+    def scenario_grid(self, legs, prices, iv_shifts=(-0.05, 0.0, 0.05), days_forward=(0, 1, 5)):
+        """Mark-to-market P&L, shape (strategies, prices, iv_shifts, days_forward)"""
+        prices = np.asarray(prices, dtype=float)
+        iv_shifts = np.asarray(iv_shifts, dtype=float)
+        elapsed = np.asarray(days_forward, dtype=float) / 365.0
+
+        # Axes: strategy, leg, price, iv shift, time
+        spot = prices[None, None, :, None, None]
+        sigma = np.maximum(legs['iv'][:, :, None, None, None] + iv_shifts[None, None, None, :, None], 1e-4)
+        remaining = legs['time_to_expiry'][:, :, None, None, None] - elapsed[None, None, None, None, :]
+
+        value = black_scholes_price(spot, legs['strike'][:, :, None, None, None], remaining, sigma,
+                                    legs['is_call'][:, :, None, None, None], self.rate)
+        leg_pnl = (value - legs['premium'][:, :, None, None, None]) * legs['units'][:, :, None, None, None]
+        return leg_pnl.sum(axis=1)
+
+    def breakevens(self, payoff, prices):
+        """Prices where expiry P&L crosses zero, interpolated linearly per strategy"""
+        left, right = payoff[:, :-1], payoff[:, 1:]
+        crossing = (np.sign(left) != np.sign(right)) & (left != 0)
+        rows, cols = np.nonzero(crossing)
+
+        x0, x1 = prices[cols], prices[cols + 1]
+        y0, y1 = left[rows, cols], right[rows, cols]
+        points = x0 - y0 * (x1 - x0) / (y1 - y0)
+
+        splits = np.searchsorted(rows, np.arange(1, payoff.shape[0]))
+        return [np.round(group, 2).tolist() for group in np.split(points, splits)]
+
+    def max_profit_loss(self, legs, payoff):
+        """Max profit and max loss at expiry; +/-inf where the payoff is unbounded"""
+        # Beyond the highest strike the payoff slope equals the net call units held
+        upside_slope = np.where(legs['is_call'], legs['units'], 0.0).sum(axis=1)
+        max_profit = np.where(upside_slope > 0, np.inf, payoff.max(axis=1))
+        max_loss = np.where(upside_slope < 0, -np.inf, payoff.min(axis=1))
+        return max_profit, max_loss
+
+    def terminal_volatility(self, legs):
+        """Per-strategy volatility (quantity-weighted leg IV) and time to nearest expiry"""
+        weights = np.abs(legs['quantity'])
+        sigma = (legs['iv'] * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-12)
+        return sigma, legs['time_to_expiry'].min(axis=1)
+
+    def risk_adjusted_score(self, legs, payoff, prices, current_price, pop, max_profit, max_loss, moves=1.0):
+        """POP x reward / risk, with reward and risk always taken over the same range.
+
+        Capped strategies use their exact max profit and max loss. Strategies
+        with unlimited profit have no exact reward, so both reward and risk come
+        from the `moves`-sigma likely range instead. Unlimited-loss strategies
+        have no defined risk, and candidates that never lose are stale-price
+        artifacts; both score 0.
+        """
+        sigma, t = self.terminal_volatility(legs)
+        spread = (moves * sigma * np.sqrt(t))[:, None]
+        likely = ((prices[None, :] >= current_price * np.exp(-spread)) &
+                  (prices[None, :] <= current_price * np.exp(spread)))
+
+        unlimited = np.isinf(max_profit)
+        reward = np.where(unlimited, np.where(likely, payoff, -np.inf).max(axis=1), max_profit)
+        risk = -np.where(unlimited, np.where(likely, payoff, np.inf).min(axis=1), max_loss)
+
+        scorable = np.isfinite(risk) & (risk > 0)
+        return np.where(scorable, pop * np.maximum(reward, 0.0) / np.where(scorable, risk, 1.0), 0.0)
+
+    def probability_of_profit(self, legs, payoff, prices, current_price):
+        """Probability that expiry P&L is positive under a lognormal terminal price"""
+        sigma, t = self.terminal_volatility(legs)
+
+        # Each grid price owns the interval between its neighbouring midpoints
+        edges = np.concatenate([[0.0], 0.5 * (prices[1:] + prices[:-1]), [np.inf]])
+        drift = np.log(current_price) + (self.rate - 0.5 * sigma ** 2) * t
+        scale = (sigma * np.sqrt(t))[:, None]
+        with np.errstate(divide='ignore'):
+            cdf = norm_cdf((np.log(edges)[None, :] - drift[:, None]) / scale)
+        probability = np.diff(cdf, axis=1)
+
+        return (probability * (payoff > 0)).sum(axis=1), (probability * payoff).sum(axis=1)
+
+    def scenarios(self, legs, rows, current_price, price_moves=(-0.05, -0.02, 0.0, 0.02, 0.05),
+                  iv_shifts=(-0.05, 0.0, 0.05), days_forward=(0, 1, 5)):
+        """Scenario P&L for the selected strategy rows, keyed by IV shift and days forward"""
+        selected = {key: values[rows] for key, values in legs.items()}
+        prices = current_price * (1 + np.asarray(price_moves, dtype=float))
+        grid = self.scenario_grid(selected, prices, iv_shifts, days_forward)
+
+        return [{
+            'prices': np.round(prices, 2).tolist(),
+            'grid': [{
+                'iv_shift': float(iv_shift),
+                'days_forward': int(days),
+                'pnl': (np.round(grid[i, :, v, d], 2) + 0.0).tolist()
+            } for v, iv_shift in enumerate(iv_shifts) for d, days in enumerate(days_forward)]
+        } for i in range(len(rows))]
+
+    def evaluate(self, strategies, current_price, today=None):
+        """Evaluate expiry payoff, breakevens, max P&L and POP for each strategy"""
+        return self._evaluate(strategies, current_price, today)[0]
+
+    def _evaluate(self, strategies, current_price, today=None):
+        try:
+            if not strategies:
+                return [], None
+
+            legs = self.stack_legs(strategies, current_price, today)
+            prices = self.price_grid(legs, current_price)
+            payoff = self.payoff_at_expiry(legs, prices)
+
+            max_profit, max_loss = self.max_profit_loss(legs, payoff)
+            breakevens = self.breakevens(payoff, prices)
+            pop, expected_pnl = self.probability_of_profit(legs, payoff, prices, current_price)
+            net_premium = -(legs['premium'] * legs['units']).sum(axis=1)
+            score = self.risk_adjusted_score(legs, payoff, prices, current_price, pop, max_profit, max_loss)
+
+            results = []
+            for i, strategy in enumerate(strategies):
+                results.append({
+                    'name': strategy['name'],
+                    'legs': [{
+                        'tradingsymbol': leg.get('tradingsymbol'),
+                        'strike': leg['strike'],
+                        'instrument_type': leg['instrument_type'],
+                        'quantity': leg['quantity'],
+                        'price': leg.get('last_price', 0),
+                        'iv': round(float(legs['iv'][i, j]), 4)
+                    } for j, leg in enumerate(strategy['legs'])],
+                    'net_premium': round(float(net_premium[i]), 2),
+                    'max_profit': None if np.isinf(max_profit[i]) else round(float(max_profit[i]), 2),
+                    'max_loss': None if np.isinf(max_loss[i]) else round(float(max_loss[i]), 2),
+                    'unlimited_profit': bool(np.isinf(max_profit[i])),
+                    'unlimited_loss': bool(np.isinf(max_loss[i])),
+                    'breakevens': breakevens[i],
+                    'probability_of_profit': round(float(pop[i]), 4),
+                    'expected_pnl': round(float(expected_pnl[i]), 2),
+                    'score': round(float(score[i]), 4)
+                })
+
+            return results, legs
+
+        except Exception as e:
+            logger.error(f"Error evaluating strategies: {str(e)}")
+            raise
+
+    def build_candidates(self, options, current_price, strikes_each_side=10, wing_widths=3):
+        """Build straddles, strangles, vertical spreads and iron condors from the chain"""
+        priced = [opt for opt in options if opt.get('last_price', 0) > 0]
+        if not priced:
+            return []
+
+        # Restrict to the nearest expiry so every leg of a strategy expires together
+        expiry = min(opt['expiry'] for opt in priced)
+        chain = {(opt['strike'], opt['instrument_type']): opt
+                 for opt in priced if opt['expiry'] == expiry}
+
+        strikes = sorted({strike for strike, _ in chain})
+        atm_index = min(range(len(strikes)), key=lambda i: abs(strikes[i] - current_price))
+        strikes = strikes[max(atm_index - strikes_each_side, 0):atm_index + strikes_each_side + 1]
+
+        def leg(strike, instrument_type, quantity):
+            option = chain.get((strike, instrument_type))
+            return dict(option, quantity=quantity) if option else None
+
+        def add(name, *legs):
+            if all(legs):
+                candidates.append({'name': name, 'legs': list(legs)})
+
+        candidates = []
+        atm = min(strikes, key=lambda strike: abs(strike - current_price))
+        add('LONG_STRADDLE', leg(atm, 'CE', 1), leg(atm, 'PE', 1))
+        add('SHORT_STRADDLE', leg(atm, 'CE', -1), leg(atm, 'PE', -1))
+
+        below = [strike for strike in strikes if strike < current_price]
+        above = [strike for strike in strikes if strike > current_price]
+
+        for put_strike in below:
+            for call_strike in above:
+                add('LONG_STRANGLE', leg(call_strike, 'CE', 1), leg(put_strike, 'PE', 1))
+                add('SHORT_STRANGLE', leg(call_strike, 'CE', -1), leg(put_strike, 'PE', -1))
+
+        for i, low in enumerate(strikes):
+            for high in strikes[i + 1:]:
+                add('BULL_CALL_SPREAD', leg(low, 'CE', 1), leg(high, 'CE', -1))
+                add('BEAR_PUT_SPREAD', leg(high, 'PE', 1), leg(low, 'PE', -1))
+
+        for i, short_put in enumerate(below):
+            for j, short_call in enumerate(above):
+                for width in range(1, wing_widths + 1):
+                    if i - width < 0 or j + width >= len(above):
+                        break
+                    add('IRON_CONDOR',
+                        leg(below[i - width], 'PE', 1), leg(short_put, 'PE', -1),
+                        leg(short_call, 'CE', -1), leg(above[j + width], 'CE', 1))
+
+        return candidates
+
+    def rank_strategies(self, options, current_price, sort_by='score', limit=10, **scenario_args):
+        """Build candidate strategies from the chain and return the best by sort_by.
+
+        scenario_args (price_moves, iv_shifts, days_forward) are passed to scenarios().
+        """
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"Unknown sort_by '{sort_by}'. Available: {', '.join(SORT_KEYS)}")
+        if not (np.isfinite(current_price) and current_price > 0):
+            raise ValueError(f"current_price must be positive, got {current_price}")
+        if limit <= 0:
+            raise ValueError(f"limit must be positive, got {limit}")
+
+        def sort_key(result):
+            # Unbounded payoffs are reported as None; rank them beyond any capped value
+            if sort_by == 'max_profit':
+                return (result['unlimited_profit'], result['max_profit'] or 0)
+            if sort_by == 'max_loss':
+                return (not result['unlimited_loss'], result['max_loss'] or 0)
+            return (True, result[sort_by])
+
+        try:
+            candidates = self.build_candidates(options, current_price)
+            results, legs = self._evaluate(candidates, current_price)
+
+            # Candidates that can never lose come from stale last prices, not real trades
+            tradable = [i for i, result in enumerate(results)
+                        if result['max_loss'] is None or result['max_loss'] < 0]
+            order = sorted(tradable, key=lambda i: sort_key(results[i]), reverse=True)[:limit]
+
+            # The 5-D scenario grid is only worth computing for the strategies returned
+            ranked = [results[i] for i in order]
+            if ranked:
+                for result, scenarios in zip(ranked, self.scenarios(legs, order, current_price, **scenario_args)):
+                    result['scenarios'] = scenarios
+            return ranked
+
+        except ValueError:
+            raise
+        except Exception as e:
+            logger.error(f"Error ranking strategies: {str(e)}")
+            return []
@@ -0,0 +1,257 @@
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import market_scanner
+from market_scanner import FIELDS, MarketScanner, is_equity_series
+from signal_generator import SignalGenerator
+
+
+@pytest.fixture
+def block_name():
+    name = f"test_scanner_{uuid.uuid4().hex[:8]}"
+    yield name
+    for generation in range(100):
+        market_scanner._unlink_block(f"{name}_{generation}")
+    market_scanner._unlink_block(name)
+
+
+def random_bars(n_symbols=200, n_bars=100, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, (n_symbols, n_bars)), axis=1))
+    matrix = np.repeat(close[None], len(FIELDS), axis=0)
+    # Recent listings: left-padded with NaN
+    matrix[:, ::7, :n_bars - 30] = np.nan
+    return matrix
+
+
+def test_score_matches_generate_final_signal():
+    scanner = MarketScanner(None)
+    indicators = scanner.calculate_indicators(random_bars())
+    direction, confidence = scanner.score(indicators)
+
+    generator = SignalGenerator(None)
+    names = {1: 'bullish', -1: 'bearish', 0: 'neutral'}
+    for i in range(indicators['close'].size):
+        signals = {key: float(values[i]) for key, values in indicators.items()}
+        expected = generator.generate_final_signal(signals, signals['close'], f"S{i}")
+
+        assert names[int(direction[i])] == expected['direction']
+        assert round(float(confidence[i]), 2) == expected['confidence']
+
+
+def test_indicators_match_pandas_reference():
+    matrix = random_bars(n_symbols=5)
+    indicators = MarketScanner(None).calculate_indicators(matrix)
+
+    close = pd.Series(matrix[FIELDS.index('close'), 1])
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+    loss = (-delta).clip(lower=0).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+    macd = (close.ewm(span=12, adjust=False, min_periods=12).mean() -
+            close.ewm(span=26, adjust=False, min_periods=26).mean())
+
+    assert indicators['rsi'][1] == pytest.approx(100 - 100 / (1 + gain.iloc[-1] / loss.iloc[-1]))
+    assert indicators['macd'][1] == pytest.approx(macd.iloc[-1])
+    assert indicators['sma_50'][1] == pytest.approx(close.iloc[-50:].mean())
+    assert indicators['bb_upper'][1] == pytest.approx(close.iloc[-20:].mean() + 2 * close.iloc[-20:].std(ddof=0))
+    # 30 bars of history is too short for a 50-bar SMA
+    assert np.isnan(indicators['sma_50'][0])
+
+
+def test_scan_reads_published_matrix_and_follows_generations(block_name):
+    writer = MarketScanner(None, name=block_name)
+    reader = MarketScanner(None, name=block_name)
+    symbols = [f"S{i}" for i in range(200)]
+
+    assert reader.scan() == {"error": "Scanner data not published yet"}
+
+    writer.publish(symbols, list(range(200)), random_bars(seed=1), {'failed': 2, 'stale': 1})
+    first = reader.scan('above_both_smas_rsi_40_60', limit=10)
+    assert first['generation'] == 1
+    assert first['universe'] == 200
+    assert first['skipped'] == {'failed': 2, 'stale': 1}
+    assert len(first['results']) == min(first['matches'], 10)
+    confidences = [result['confidence'] for result in first['results']]
+    assert confidences == sorted(confidences, reverse=True)
+    for result in first['results']:
+        indicators = result['indicators']
+        assert result['close'] > indicators['sma_20'] and result['close'] > indicators['sma_50']
+        assert 40 < indicators['rsi'] < 60
+
+    writer.publish(symbols[:50], list(range(50)), random_bars(n_symbols=50, seed=2))
+    assert reader.scan()['generation'] == 2
+    assert reader.scan()['universe'] == 50
+
+
+def test_scan_rejects_unknown_screen():
+    with pytest.raises(ValueError):
+        MarketScanner(None).scan('typo')
+
+
+def test_concurrent_scans_survive_republishing(block_name):
+    writer = MarketScanner(None, name=block_name)
+    reader = MarketScanner(None, name=block_name)
+    symbols = [f"S{i}" for i in range(500)]
+    writer.publish(symbols, list(range(500)), random_bars(n_symbols=500))
+
+    errors = []
+    done = threading.Event()
+
+    def scan():
+        while not done.is_set():
+            try:
+                result = reader.scan('bullish', limit=5)
+                assert 'results' in result, result
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=scan) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for seed in range(20):
+        writer.publish(symbols, list(range(500)), random_bars(n_symbols=500, seed=seed))
+    done.set()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert reader.scan()['generation'] == 21
+
+
+class FakeKite:
+    """Five symbols: healthy, flaky, failing, empty and suspended"""
+
+    def __init__(self):
+        self.calls = {}
+
+    def get_instruments(self, exchange="NSE"):
+        symbols = ['OK', 'FLAKY', 'DOWN', 'EMPTY', 'SUSPENDED', 'SGBTEST-GB', 'BAJAJ-AUTO']
+        return [{'tradingsymbol': symbol, 'instrument_token': token, 'segment': 'NSE', 'instrument_type': 'EQ'}
+                for token, symbol in enumerate(symbols)]
+
+    def get_historical_data(self, instrument_token, from_date, to_date, interval="day"):
+        self.calls[instrument_token] = self.calls.get(instrument_token, 0) + 1
+        if instrument_token == 1 and self.calls[1] < 3:
+            raise IOError("Too many requests")
+        if instrument_token == 2:
+            raise IOError("Service unavailable")
+        if instrument_token == 3:
+            return []
+
+        last = datetime(2026, 10, 16) - timedelta(days=20 if instrument_token == 4 else 0)
+        return [{'date': last - timedelta(days=29 - d), 'open': 100, 'high': 101, 'low': 99,
+                 'close': 100 + d, 'volume': 1000} for d in range(30)]
+
+
+def test_fetch_bars_retries_and_reports_skipped_symbols():
+    kite = FakeKite()
+    scanner = MarketScanner(kite, requests_per_second=1000, retries=3, backoff=0)
+
+    universe = scanner.get_universe()
+    assert 'SGBTEST-GB' not in universe
+    assert 'BAJAJ-AUTO' in universe
+
+    symbols, tokens, matrix, skipped = scanner.fetch_bars(universe)
+    assert symbols == ['OK', 'FLAKY', 'BAJAJ-AUTO']
+    assert tokens == [0, 1, 6]
+    assert matrix.shape == (len(FIELDS), 3, scanner.bars)
+    assert np.isnan(matrix[:, :, :-30]).all()
+    assert matrix[FIELDS.index('close'), 0, -1] == 129
+    assert skipped == {'failed': 2, 'stale': 1}
+    assert kite.calls[1] == 3
+    assert kite.calls[2] == 4
+
+
+@pytest.mark.parametrize('tradingsymbol, expected', [
+    ('RELIANCE', True), ('BAJAJ-AUTO', True), ('NAM-INDIA', True), ('MCDOWELL-N', True),
+    ('NIFTY 50', True), ('ABC-BE', False), ('XYZ-SM', False), ('SGBMAR29-GB', False),
+    ('IRFC-N1', False), ('NHAI-NB', False), ('INDIGRID-IV', False),
+])
+def test_is_equity_series(tradingsymbol, expected):
+    assert is_equity_series(tradingsymbol) == expected
+
+
+class FailingKite(FakeKite):
+    """Every symbol after the first `healthy` fails with `error`"""
+
+    def __init__(self, error, healthy=0, n_symbols=50):
+        super().__init__()
+        self.error = error
+        self.healthy = healthy
+        self.n_symbols = n_symbols
+
+    def get_instruments(self, exchange="NSE"):
+        return [{'tradingsymbol': f"S{token}", 'instrument_token': token, 'segment': 'NSE', 'instrument_type': 'EQ'}
+                for token in range(self.n_symbols)]
+
+    def get_historical_data(self, instrument_token, from_date, to_date, interval="day"):
+        if instrument_token >= self.healthy:
+            self.calls[instrument_token] = self.calls.get(instrument_token, 0) + 1
+            raise self.error
+        return super().get_historical_data(0, from_date, to_date, interval)
+
+
+def fast_scanner(kite, name, **kwargs):
+    return MarketScanner(kite, name=name, requests_per_second=10000, retries=1, backoff=0, **kwargs)
+
+
+def test_refresh_keeps_previous_generation_when_fetch_mostly_fails(block_name):
+    assert fast_scanner(FailingKite(IOError("down"), healthy=50), block_name).refresh() == 1
+
+    # 30 of 50 failing is over the 50% limit, and stays under the consecutive-failure abort
+    kite = FailingKite(IOError("down"), healthy=20)
+    assert fast_scanner(kite, block_name, max_consecutive_failures=100).refresh() is None
+
+    reader = MarketScanner(None, name=block_name)
+    result = reader.scan()
+    assert result['generation'] == 1
+    assert result['universe'] == 50
+
+
+def test_fetch_aborts_after_consecutive_failures(block_name):
+    kite = FailingKite(IOError("down"))
+    scanner = fast_scanner(kite, block_name, max_consecutive_failures=5)
+
+    with pytest.raises(RuntimeError):
+        scanner.refresh()
+    assert len(kite.calls) == 5
+
+
+def test_fetch_aborts_immediately_on_rejected_session(block_name):
+    kite = FailingKite(market_scanner.kite_exceptions.TokenException("Token expired"), healthy=3)
+    scanner = fast_scanner(kite, block_name)
+
+    with pytest.raises(RuntimeError):
+        scanner.refresh()
+    # No retries and no further symbols once the token is rejected
+    assert kite.calls[3] == 1 and 4 not in kite.calls
+    assert MarketScanner(None, name=block_name).scan() == {"error": "Scanner data not published yet"}
+
+
+
+class LaggingKite(FakeKite):
+    """Symbol i last traded i sessions before the latest one (weekdays only)"""
+
+    def get_instruments(self, exchange="NSE"):
+        return [{'tradingsymbol': f"LAG{token}", 'instrument_token': token, 'segment': 'NSE', 'instrument_type': 'EQ'}
+                for token in range(6)]
+
+    def get_historical_data(self, instrument_token, from_date, to_date, interval="day"):
+        sessions = [day for day in (datetime(2026, 10, 16) - timedelta(days=d) for d in range(60))
+                    if day.weekday() < 5][::-1]
+        return [{'date': day, 'open': 100, 'high': 101, 'low': 99, 'close': 100, 'volume': 1000}
+                for day in sessions[:len(sessions) - instrument_token]]
+
+
+def test_fetch_bars_tolerates_a_few_sessions_of_lag():
+    scanner = MarketScanner(LaggingKite(), requests_per_second=1000, stale_sessions=3)
+    symbols, _, _, skipped = scanner.fetch_bars(scanner.get_universe())
+
+    # A missing partial candle (1 session) or a short halt is kept; 4+ sessions behind is stale
+    assert symbols == ['LAG0', 'LAG1', 'LAG2', 'LAG3']
+    assert skipped == {'failed': 0, 'stale': 2}
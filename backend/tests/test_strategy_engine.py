@@ -0,0 +1,151 @@
+import numpy as np
+import pytest
+from datetime import date, timedelta
+
+from strategy_engine import (StrategyEngine, black_scholes_price, implied_volatility,
+                             years_to_expiry)
+
+TODAY = date.today()
+EXPIRY = TODAY + timedelta(days=30)
+
+
+def option(strike, instrument_type, last_price, lot_size=1):
+    return {
+        'tradingsymbol': f"TEST{strike}{instrument_type}",
+        'strike': strike,
+        'instrument_type': instrument_type,
+        'expiry': EXPIRY,
+        'lot_size': lot_size,
+        'last_price': last_price
+    }
+
+
+def chain(spot=100.0, sigma=0.25):
+    t = years_to_expiry(EXPIRY, TODAY)
+    return [option(strike, instrument_type,
+                   round(float(black_scholes_price(spot, strike, t, sigma, instrument_type == 'CE')), 2))
+            for strike in range(80, 121, 2) for instrument_type in ('CE', 'PE')]
+
+
+def test_black_scholes_implied_volatility_round_trip():
+    strikes = np.array([80.0, 95.0, 100.0, 105.0, 120.0])
+    is_call = np.array([True, False, True, False, True])
+    sigma = np.array([0.15, 0.2, 0.3, 0.45, 0.6])
+
+    prices = black_scholes_price(100.0, strikes, 0.25, sigma, is_call)
+    np.testing.assert_allclose(implied_volatility(prices, 100.0, strikes, 0.25, is_call), sigma, atol=1e-6)
+
+
+def test_black_scholes_put_call_parity():
+    call = black_scholes_price(100.0, 105.0, 0.5, 0.2, True, rate=0.05)
+    put = black_scholes_price(100.0, 105.0, 0.5, 0.2, False, rate=0.05)
+    assert call - put == pytest.approx(100.0 - 105.0 * np.exp(-0.05 * 0.5), abs=1e-5)
+
+
+def test_implied_volatility_is_nan_below_intrinsic():
+    assert np.isnan(implied_volatility(1.0, 100.0, 90.0, 0.25, True))
+
+
+def test_long_straddle_breakevens_are_strike_plus_minus_premium():
+    legs = [dict(option(100, 'CE', 4.0, lot_size=50), quantity=1),
+            dict(option(100, 'PE', 3.0, lot_size=50), quantity=1)]
+    result, = StrategyEngine().evaluate([{'name': 'LONG_STRADDLE', 'legs': legs}], 100.0, today=TODAY)
+
+    assert result['breakevens'] == [93.0, 107.0]
+    assert result['net_premium'] == -350.0
+    assert result['max_loss'] == -350.0
+    assert result['max_profit'] is None and result['unlimited_profit']
+    assert not result['unlimited_loss']
+
+
+def test_iron_condor_profit_and_loss_are_capped():
+    legs = [dict(option(90, 'PE', 1.0), quantity=1),
+            dict(option(95, 'PE', 2.5), quantity=-1),
+            dict(option(105, 'CE', 2.5), quantity=-1),
+            dict(option(110, 'CE', 1.0), quantity=1)]
+    result, = StrategyEngine().evaluate([{'name': 'IRON_CONDOR', 'legs': legs}], 100.0, today=TODAY)
+
+    # Credit 3.0 on 5-wide wings
+    assert result['max_profit'] == pytest.approx(3.0)
+    assert result['max_loss'] == pytest.approx(-2.0)
+    assert not result['unlimited_profit'] and not result['unlimited_loss']
+    assert result['breakevens'] == [92.0, 108.0]
+    assert 0 < result['probability_of_profit'] < 1
+
+
+def test_evaluate_batches_strategies_with_different_leg_counts():
+    single = {'name': 'CALL_BUY', 'legs': [dict(option(100, 'CE', 4.0), quantity=1)]}
+    spread = {'name': 'BULL_CALL_SPREAD', 'legs': [dict(option(100, 'CE', 4.0), quantity=1),
+                                                   dict(option(105, 'CE', 2.0), quantity=-1)]}
+    call, bull = StrategyEngine().evaluate([single, spread], 100.0, today=TODAY)
+
+    assert call['breakevens'] == [104.0] and call['unlimited_profit']
+    assert bull['breakevens'] == [102.0]
+    assert bull['max_profit'] == pytest.approx(3.0)
+    assert bull['max_loss'] == pytest.approx(-2.0)
+
+
+def test_rank_strategies_attaches_scenarios_to_returned_strategies_only():
+    ranked = StrategyEngine().rank_strategies(chain(), 100.0, limit=3, price_moves=(-0.1, 0.0, 0.1),
+                                              iv_shifts=(0.0, 0.05), days_forward=(0, 7))
+
+    assert len(ranked) == 3
+    scenarios = ranked[0]['scenarios']
+    assert scenarios['prices'] == [90.0, 100.0, 110.0]
+    assert [(cell['iv_shift'], cell['days_forward']) for cell in scenarios['grid']] == [
+        (0.0, 0), (0.0, 7), (0.05, 0), (0.05, 7)]
+    assert all(len(cell['pnl']) == 3 for cell in scenarios['grid'])
+
+
+def test_rank_strategies_default_score_avoids_deep_itm_verticals():
+    ranked = StrategyEngine().rank_strategies(chain(), 100.0, limit=5)
+
+    scores = [result['score'] for result in ranked]
+    assert scores == sorted(scores, reverse=True)
+    for result in ranked:
+        assert result['max_loss'] is None or result['max_profit'] is None or \
+            result['max_profit'] > 0.1 * abs(result['max_loss'])
+
+
+def test_rank_strategies_by_max_profit_puts_unlimited_first():
+    ranked = StrategyEngine().rank_strategies(chain(), 100.0, sort_by='max_profit', limit=3)
+    assert all(result['unlimited_profit'] for result in ranked)
+
+
+def test_rank_strategies_rejects_unknown_sort_key():
+    with pytest.raises(ValueError):
+        StrategyEngine().rank_strategies(chain(), 100.0, sort_by='typo')
+
+
+@pytest.mark.parametrize('current_price, limit', [(-5.0, 10), (0.0, 10), (float('nan'), 10), (100.0, 0), (100.0, -3)])
+def test_rank_strategies_rejects_invalid_price_and_limit(current_price, limit):
+    with pytest.raises(ValueError):
+        StrategyEngine().rank_strategies(chain(), current_price, limit=limit)
+
+
+def test_score_is_pop_weighted_reward_to_risk_for_capped_strategies():
+    legs = [dict(option(100, 'CE', 4.0), quantity=1), dict(option(105, 'CE', 2.0), quantity=-1)]
+    result, = StrategyEngine().evaluate([{'name': 'BULL_CALL_SPREAD', 'legs': legs}], 100.0, today=TODAY)
+    assert result['score'] == pytest.approx(result['probability_of_profit'] * 3.0 / 2.0, rel=1e-3)
+
+
+def test_riskless_and_unlimited_loss_candidates_are_not_scored():
+    stale = {'name': 'BULL_CALL_SPREAD', 'legs': [dict(option(100, 'CE', 3.0), quantity=1),
+                                                  dict(option(105, 'CE', 3.0), quantity=-1)]}
+    naked = {'name': 'CALL_SELL', 'legs': [dict(option(105, 'CE', 2.0), quantity=-1)]}
+    riskless, unlimited = StrategyEngine().evaluate([stale, naked], 100.0, today=TODAY)
+
+    assert riskless['max_loss'] == 0.0 and riskless['score'] == 0.0
+    assert unlimited['unlimited_loss'] and unlimited['score'] == 0.0
+
+
+def test_rank_strategies_drops_candidates_that_never_lose():
+    options = chain()
+    # A stale quote makes the 100/102 call spread free
+    for opt in options:
+        if opt['instrument_type'] == 'CE' and opt['strike'] in (100, 102):
+            opt['last_price'] = 3.0
+
+    for sort_by in ('score', 'probability_of_profit'):
+        ranked = StrategyEngine().rank_strategies(options, 100.0, sort_by=sort_by, limit=20)
+        assert all(result['max_loss'] is None or result['max_loss'] < 0 for result in ranked)